@@ -52,6 +52,7 @@ from tests.test_constants import TEST_REPORTING_GUID
 from tests.test_constants import TEST_SPREADSHEET
 from validators.spreadsheet_error import ConnectionDependencyError
 from validators.spreadsheet_error import CrossSheetDependencyError
+from validators.spreadsheet_error import DuplicateCodeError
 from validators.spreadsheet_error import MissingSpreadsheetValueError
 from validators.spreadsheet_error import SpreadsheetHeaderError
 from validators.spreadsheet_validator import SpreadsheetValidator
@@ -115,6 +116,48 @@ class SpreadsheetValidatorTest(absltest.TestCase):
     self.assertEqual(validation_error.table, ENTITY_FIELDS)
     self.assertEqual(validation_error.target_table, ENTITIES)
 
+  def testBlankReportingFieldNameCellIsValid(self):
+    # Blank trailing cells are parsed from Google Sheets as empty lists.
+    test_field_blank_reporting_field_name = {
+        STANDARD_FIELD_NAME: 'test_field_name',
+        RAW_FIELD_NAME: 'pointset.raw_field_name',
+        ENTITY_CODE: TEST_REPORTING_ENTITY_CODE,
+        REPORTING_ENTITY_CODE: TEST_REPORTING_ENTITY_CODE,
+        REPORTING_ENTITY_GUID: TEST_REPORTING_GUID,
+        BC_GUID: TEST_REPORTING_GUID,
+        RAW_UNIT_PATH: 'no-units',
+        STANDARD_UNIT_VALUE: 'no-units',
+        RAW_UNIT_VALUE: 'no-units',
+        METADATA + '.test': 'test metadata',
+        REPORTING_ENTITY_FIELD_NAME: []
+    }
+    self.test_spreadsheet[ENTITY_FIELDS].append(
+        test_field_blank_reporting_field_name)
+
+    is_valid = self.validator.Validate(self.test_spreadsheet)
+
+    self.assertTrue(is_valid)
+    self.assertEmpty(self.validator.validation_errors)
+
+  def testBlankStateCellsLogErrors(self):
+    # Blank trailing cells are parsed from Google Sheets as empty lists.
+    test_state_blank_cells = {
+        ENTITY_CODE: TEST_REPORTING_ENTITY_CODE,
+        BC_GUID: TEST_REPORTING_GUID,
+        STANDARD_FIELD_NAME: [],
+        STANDARD_STATE: [],
+        RAW_STATE: []
+    }
+    self.test_spreadsheet[STATES].append(test_state_blank_cells)
+
+    is_valid = self.validator.Validate(self.test_spreadsheet)
+    error_types = [type(error) for error in self.validator.validation_errors]
+
+    self.assertFalse(is_valid)
+    self.assertLen(error_types, 4)
+    self.assertEqual(error_types.count(MissingSpreadsheetValueError), 3)
+    self.assertEqual(error_types.count(CrossSheetDependencyError), 1)
+
   def testValidateContainsLogsMissingSpreadsheetValueError(self):
     test_virtual_entity_dict = {
         ENTITY_CODE: None,
@@ -154,6 +197,24 @@ class SpreadsheetValidatorTest(absltest.TestCase):
     self.assertIsInstance(self.validator.validation_errors.pop(),
                           SpreadsheetHeaderError)
 
+  def testMissingEntityHeadersSkipsEntityValidation(self):
+    test_entity_dict_missing_guid_and_namespace_headers = {
+        ENTITY_CODE: 'A_BUILDING_FLOOR',
+        TYPE_NAME: 'test_type',
+        IS_REPORTING: 'FALSE',
+        METADATA + '.test': 'test metadata'
+    }
+    self.test_spreadsheet[ENTITIES] = [
+        test_entity_dict_missing_guid_and_namespace_headers
+    ]
+
+    is_valid = self.validator.Validate(self.test_spreadsheet)
+
+    self.assertFalse(is_valid)
+    self.assertNotEmpty(self.validator.validation_errors)
+    for validation_error in self.validator.validation_errors:
+      self.assertIsInstance(validation_error, SpreadsheetHeaderError)
+
   def testConnectionToBuildingIsValid(self):
     test_connection_to_building = {
         SOURCE_ENTITY_CODE: 'UK-LON-S2',
@@ -185,13 +246,46 @@ class SpreadsheetValidatorTest(absltest.TestCase):
     self.assertIsInstance(self.validator.validation_errors.pop(),
                           ConnectionDependencyError)
 
+  def testInvalidConnectionTargetReportsTargetAsMissing(self):
+    test_connection_to_building = {
+        SOURCE_ENTITY_CODE: TEST_REPORTING_ENTITY_CODE,
+        SOURCE_ENTITY_GUID: None,
+        TARGET_ENTITY_CODE: 'INVALID_ENTITY_CODE',
+        TARGET_ENTITY_GUID: None,
+        CONNECTION_TYPE: 'CONTAINS'
+    }
+    self.test_spreadsheet[CONNECTIONS].append(test_connection_to_building)
+
+    is_valid = self.validator.Validate(self.test_spreadsheet)
+    validation_error = self.validator.validation_errors.pop()
+
+    self.assertFalse(is_valid)
+    self.assertIsInstance(validation_error, ConnectionDependencyError)
+    self.assertEqual(validation_error.missing_code, 'INVALID_ENTITY_CODE')
+    self.assertEqual(validation_error.present_code, TEST_REPORTING_ENTITY_CODE)
+
+  def testFieldsReferencingEmptyEntitiesSheetLogErrors(self):
+    self.test_spreadsheet[ENTITIES] = []
+    self.test_spreadsheet[CONNECTIONS] = []
+
+    is_valid = self.validator.Validate(self.test_spreadsheet)
+
+    self.assertFalse(is_valid)
+    self.assertNotEmpty(self.validator.validation_errors)
+    for validation_error in self.validator.validation_errors:
+      self.assertIsInstance(validation_error, CrossSheetDependencyError)
+
   def testDuplicateEntityCodes(self):
     test_entity_with_duplicate_code = TEST_REPORTING_ENTITY_DICT.copy()
     self.test_spreadsheet[ENTITIES].append(test_entity_with_duplicate_code)
 
     validator_results = self.validator.Validate(self.test_spreadsheet)
+    validation_error = self.validator.validation_errors.pop()
 
     self.assertFalse(validator_results)
+    self.assertIsInstance(validation_error, DuplicateCodeError)
+    self.assertEqual(validation_error.code, TEST_REPORTING_ENTITY_CODE)
+    self.assertEndsWith(validation_error.message, 'rows: 2, 4.')
 
   def testFacilitiesEntityMissingGuid(self):
     facilities_entity_no_guid = {
@@ -217,10 +311,14 @@ class SpreadsheetValidatorTest(absltest.TestCase):
     is_valid = self.validator.Validate(self.test_spreadsheet)
 
     self.assertLen(no_guid_validator_results, 1)
-    self.assertIsInstance(no_guid_validator_results.pop(),
-                          MissingSpreadsheetValueError)
+    no_guid_error = no_guid_validator_results.pop()
+    self.assertIsInstance(no_guid_error, MissingSpreadsheetValueError)
+    # Spreadsheet rows are numbered from 2, after the column header row.
+    self.assertEqual(no_guid_error.row, 2)
     self.assertEmpty(with_guid_validator_results)
     self.assertFalse(is_valid)
+    # The appended entity follows the two test entities in rows 2 and 3.
+    self.assertEqual(self.validator.validation_errors.pop().row, 4)
 
   # pylint: disable=line-too-long
   def testCreatesLogFile(self):
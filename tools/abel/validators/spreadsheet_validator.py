@@ -14,8 +14,11 @@
 """Module to validate a Google Sheets spreadsheet."""
 
 import collections
+import dataclasses
 import logging
-from typing import Dict, List
+import operator
+import sys
+from typing import Counter, Dict, FrozenSet, Iterator, List, Optional, Tuple
 
 from model.constants import ALL_CONNECTION_HEADERS
 from model.constants import ALL_ENTITY_HEADERS
@@ -51,6 +54,42 @@ from validators.spreadsheet_error import SpreadsheetHeaderError
 
 _COLUMN_HEADER_INDEX = 1
 _ROW_START_INDEX = 2
+# Column headers whose cell values are used as keys in cross-sheet lookups.
+_CODE_HEADERS = (ENTITY_CODE, BUILDING_CODE, REPORTING_ENTITY_CODE,
+                 SOURCE_ENTITY_CODE, TARGET_ENTITY_CODE)
+
+
+def _CellKey(cell: object) -> str:
+  """Returns a cell value that can be used as a hash key.
+
+  Blank trailing cells are parsed from Google Sheets as empty lists, which are
+  unhashable, so any non-string cell is keyed as an empty string.
+
+  Args:
+    cell: A cell value from a parsed sheet.
+
+  Returns:
+    cell if it is a string, otherwise an empty string.
+  """
+  return cell if isinstance(cell, str) else ''
+
+
+@dataclasses.dataclass(frozen=True)
+class _SpreadsheetIndex(object):
+  """Lookup tables shared by the cross-sheet validations.
+
+  Attributes:
+    entity_codes: Codes defined in the Entities table.
+    all_codes: Codes defined in either the Entities or the Sites table.
+    fields_by_standard_name: Number of entity fields keyed by entity code and
+      standard field name.
+    fields_by_reporting_name: Number of entity fields keyed by reporting entity
+      code and reporting entity field name.
+  """
+  entity_codes: FrozenSet[str]
+  all_codes: FrozenSet[str]
+  fields_by_standard_name: Counter[Tuple[str, str]]
+  fields_by_reporting_name: Counter[Tuple[str, str]]
 
 
 class SpreadsheetValidator(object):
@@ -59,6 +98,12 @@ class SpreadsheetValidator(object):
   def __init__(self, filepath: str):
     self.filepath = filepath
     self.validation_errors = []
+    logging.basicConfig(
+        filename=self.filepath,
+        filemode='w',
+        format='%(levelname)s - %(message)s',
+    )
+    self._logger = logging.getLogger(__name__)
 
   def Validate(self, parsed_spreadsheet: Dict[str, List[Dict[str,
                                                              str]]]) -> bool:
@@ -67,10 +112,12 @@ class SpreadsheetValidator(object):
     This method validates the following in order:
       1. All column headers are present in a spreadsheet. All is defined in
         constants.py
-      2. If the above validation passes then a subset of those headers are
+      2. If the above validation passes then entity codes are validated to be
+        unique and Facilities entities are validated to have guids.
+      3. If the above validations pass then a subset of those headers are
         validated such that they contain cell values for every row in the
         spreadsheet.
-      3. Validates cell values referenced in multiple sheets exist.
+      4. Validates cell values referenced in multiple sheets exist.
 
     Args:
       parsed_spreadsheet: A concrete model spreadsheet parsed into python data
@@ -91,38 +138,124 @@ class SpreadsheetValidator(object):
         (CONNECTIONS, parsed_spreadsheet[CONNECTIONS],
          REQUIRED_CONNECTION_HEADERS, ALL_CONNECTION_HEADERS)
     ]
-    is_valid = True
-
-    entities_sheet = parsed_spreadsheet[ENTITIES]
-    self.validation_errors += self._ValidateEntityCodes(entities_sheet)
-    self.validation_errors += self.ValidateFacilitiesGuids(entities_sheet)
+    validation_errors = []
     for parameter_list in validation_parameters:
-      self.validation_errors += self._ValidateHeaders(
-          table=parameter_list[0],
-          parsed_sheet=parameter_list[1],
-          column_headers=parameter_list[3])
-    # Validate spreadsheet contents only after required spreadsheet headers
-    # are present.
-    if not self.validation_errors:
+      validation_errors.extend(
+          self._ValidateHeaders(
+              table=parameter_list[0],
+              parsed_sheet=parameter_list[1],
+              column_headers=parameter_list[3]))
+    # Every remaining validation reads cells by column header, so stop as soon
+    # as any spreadsheet header is missing.
+    if validation_errors:
+      return self._RecordErrors(validation_errors)
+
+    self._InternCodes(parsed_spreadsheet)
+    duplicate_errors, guid_errors = self._ValidateEntitiesSheet(
+        parsed_spreadsheet[ENTITIES])
+    validation_errors.extend(duplicate_errors)
+    validation_errors.extend(guid_errors)
+    # Validate spreadsheet contents only after entity codes and guids are valid.
+    if not validation_errors:
       for parameter_list in validation_parameters:
-        self.validation_errors += self._ValidateContents(
-            table=parameter_list[0],
-            parsed_sheet=parameter_list[1],
-            col_headers_values=parameter_list[2])
-      self.validation_errors += self._ValidateFieldsAcrossSheets(
-          parsed_spreadsheet)
-      self.validation_errors += self._ValidateStatesAcrossSheets(
-          parsed_spreadsheet)
-      self.validation_errors += self._ValidateConnections(
-          parsed_spreadsheet=parsed_spreadsheet)
-    if self.validation_errors:
-      self._LogErrors(validation_errors=self.validation_errors)
-      is_valid = False
-    return is_valid
+        validation_errors.extend(
+            self._ValidateContents(
+                table=parameter_list[0],
+                parsed_sheet=parameter_list[1],
+                col_headers_values=parameter_list[2]))
+      index = self._IndexSpreadsheet(parsed_spreadsheet)
+      validation_errors.extend(
+          self._ValidateFieldsAcrossSheets(
+              parsed_spreadsheet=parsed_spreadsheet, index=index))
+      validation_errors.extend(
+          self._ValidateStatesAcrossSheets(
+              parsed_spreadsheet=parsed_spreadsheet, index=index))
+      validation_errors.extend(
+          self._ValidateConnections(
+              parsed_spreadsheet=parsed_spreadsheet, index=index))
+    return self._RecordErrors(validation_errors)
+
+  def _RecordErrors(self,
+                    validation_errors: List[BaseSpreadsheetError]) -> bool:
+    """Stores and logs the errors found by a validation run.
+
+    Args:
+      validation_errors: A list of errors extending BaseSpreadsheetError.
+
+    Returns:
+      A boolean value indicating whether no errors were found.
+    """
+    self.validation_errors = validation_errors
+    if validation_errors:
+      self._LogErrors(validation_errors=validation_errors)
+      return False
+    return True
+
+  def _InternCodes(
+      self, parsed_spreadsheet: Dict[str, List[Dict[str, str]]]) -> None:
+    """Interns code cell values in place so repeated codes share one string.
+
+    Codes are hashed and compared in every cross-sheet lookup. Interning them
+    once lets set and dict lookups match on identity. The rows of
+    parsed_spreadsheet are modified in place, so callers that reuse the same
+    spreadsheet, e.g. ModelBuilder.FromSpreadsheet, see the interned values.
+    Interned values compare equal to the originals.
+
+    Args:
+      parsed_spreadsheet: A concrete model spreadsheet parsed into python data
+        types.
+    """
+    for sheet in parsed_spreadsheet.values():
+      for row in sheet:
+        for header in _CODE_HEADERS:
+          code = row.get(header)
+          if code and isinstance(code, str):
+            row[header] = sys.intern(code)
+
+  def _IndexSpreadsheet(
+      self, parsed_spreadsheet: Dict[str, List[Dict[str, str]]]
+  ) -> _SpreadsheetIndex:
+    """Builds the lookup tables used by the cross-sheet validations.
+
+    Each referenced sheet is read once here, so the cross-sheet validations
+    only walk the sheet they validate. A table is left empty when the sheet
+    validated against it is empty, since no validation would read it.
+
+    Args:
+      parsed_spreadsheet: A concrete model spreadsheet parsed into python data
+        types.
+
+    Returns:
+      A _SpreadsheetIndex instance for parsed_spreadsheet.
+    """
+    fields = parsed_spreadsheet.get(ENTITY_FIELDS, [])
+    has_connections = bool(parsed_spreadsheet[CONNECTIONS])
+    entity_codes = frozenset()
+    all_codes = frozenset()
+    if fields or has_connections:
+      entity_codes = frozenset(
+          row[ENTITY_CODE] for row in parsed_spreadsheet[ENTITIES])
+    if has_connections:
+      all_codes = entity_codes.union(
+          row[BUILDING_CODE] for row in parsed_spreadsheet[SITES])
+    fields_by_standard_name = collections.Counter()
+    fields_by_reporting_name = collections.Counter()
+    if parsed_spreadsheet.get(STATES):
+      for field in fields:
+        fields_by_standard_name[(_CellKey(field[ENTITY_CODE]),
+                                 _CellKey(field[STANDARD_FIELD_NAME]))] += 1
+        fields_by_reporting_name[(
+            _CellKey(field[REPORTING_ENTITY_CODE]),
+            _CellKey(field[REPORTING_ENTITY_FIELD_NAME]))] += 1
+    return _SpreadsheetIndex(
+        entity_codes=entity_codes,
+        all_codes=all_codes,
+        fields_by_standard_name=fields_by_standard_name,
+        fields_by_reporting_name=fields_by_reporting_name)
 
   def _ValidateContents(
       self, table: str, parsed_sheet: List[Dict[str, str]],
-      col_headers_values: List[str]) -> List[MissingSpreadsheetValueError]:
+      col_headers_values: List[str]) -> Iterator[MissingSpreadsheetValueError]:
     """Validates cell values for a given table in a concrete model spreadsheet.
 
     This method does not validate that all cells in a row are not empty. It only
@@ -136,24 +269,35 @@ class SpreadsheetValidator(object):
       col_headers_values: List of required column headers where no cell value is
         empty for a given column.
 
-    Returns:
-      A boolean value for whether parsed_sheet is valid.
+    Yields:
+      MissingSpreadsheetValueError instances for empty required cells.
     """
-    self.validation_errors = []
+    if not col_headers_values:
+      return
+    messages = {
+        header: f'{table} entry must have a {header}'
+        for header in col_headers_values
+    }
+    is_single_header = len(col_headers_values) == 1
+    get_required_values = operator.itemgetter(*col_headers_values)
     for row_number, row in enumerate(parsed_sheet, _ROW_START_INDEX):
-      for header in col_headers_values:
-        if not row[header]:
-          self.validation_errors.append(
-              MissingSpreadsheetValueError(
-                  table=table,
-                  row=row_number,
-                  column=header,
-                  message=f'{table} entry must have a {header}'))
-    return self.validation_errors
+      values = get_required_values(row)
+      # itemgetter returns a bare value rather than a tuple for a single key.
+      if is_single_header:
+        values = (values,)
+      if all(values):
+        continue
+      for header, value in zip(col_headers_values, values):
+        if not value:
+          yield MissingSpreadsheetValueError(
+              table=table,
+              row=row_number,
+              column=header,
+              message=messages[header])
 
   def _ValidateFieldsAcrossSheets(
-      self, parsed_spreadsheet: Dict[str, List[Dict[str, str]]]
-  ) -> List[CrossSheetDependencyError]:
+      self, parsed_spreadsheet: Dict[str, List[Dict[str, str]]],
+      index: _SpreadsheetIndex) -> Iterator[CrossSheetDependencyError]:
     """Validates dependencies between entity fields and entities.
 
     Validates that the virtual entity code and reporting entity code for an
@@ -161,41 +305,39 @@ class SpreadsheetValidator(object):
 
     Args:
       parsed_spreadsheet: Dictionary representation of an ABEL spreadsheet.
+      index: Lookup tables for parsed_spreadsheet.
 
-    Returns:
-      List of CrossSheetDependencyError instances.
+    Yields:
+      CrossSheetDependencyError instances.
     """
-    self.validation_errors = []
     fields = parsed_spreadsheet.get(ENTITY_FIELDS, [])
-    entities = parsed_spreadsheet.get(ENTITIES, [])
+    if not fields:
+      return
+    entity_codes = index.entity_codes
 
     for row_num, field in enumerate(fields, _ROW_START_INDEX):
 
       field_reporting_entity_code = field.get(REPORTING_ENTITY_CODE)
       field_entity_code = field.get(ENTITY_CODE)
-      entity_codes = set(entity.get(ENTITY_CODE) for entity in entities)
 
       if field_entity_code not in entity_codes:
-        self.validation_errors.append(
-            CrossSheetDependencyError(
-                source_table=ENTITY_FIELDS,
-                target_table=ENTITIES,
-                row=row_num,
-                column=ENTITY_CODE,
-                cell_value=field_entity_code))
+        yield CrossSheetDependencyError(
+            source_table=ENTITY_FIELDS,
+            target_table=ENTITIES,
+            row=row_num,
+            column=ENTITY_CODE,
+            cell_value=field_entity_code)
       if field_reporting_entity_code not in entity_codes:
-        self.validation_errors.append(
-            CrossSheetDependencyError(
-                source_table=ENTITY_FIELDS,
-                target_table=ENTITIES,
-                row=row_num,
-                column=REPORTING_ENTITY_CODE,
-                cell_value=field_reporting_entity_code))
-    return self.validation_errors
+        yield CrossSheetDependencyError(
+            source_table=ENTITY_FIELDS,
+            target_table=ENTITIES,
+            row=row_num,
+            column=REPORTING_ENTITY_CODE,
+            cell_value=field_reporting_entity_code)
 
   def _ValidateStatesAcrossSheets(
-      self, parsed_spreadsheet: Dict[str, List[Dict[str, str]]]
-  ) -> List[CrossSheetDependencyError]:
+      self, parsed_spreadsheet: Dict[str, List[Dict[str, str]]],
+      index: _SpreadsheetIndex) -> Iterator[CrossSheetDependencyError]:
     """Validates dependencies between entity fields and states.
 
     Validates that each state listed in the States table maps 1:1 to the Entity
@@ -205,40 +347,37 @@ class SpreadsheetValidator(object):
 
     Args:
       parsed_spreadsheet: Dictionary representation of an ABEL spreadsheet.
+      index: Lookup tables for parsed_spreadsheet.
 
-    Returns:
-      List of CrossSheetDependencyError instances.
+    Yields:
+      CrossSheetDependencyError instances.
 
     """
-    validation_errors = []
     states = parsed_spreadsheet.get(STATES, [])
-    fields = parsed_spreadsheet.get(ENTITY_FIELDS, [])
+    if not states:
+      return
+    fields_by_standard_name = index.fields_by_standard_name
+    fields_by_reporting_name = index.fields_by_reporting_name
     for row_num, state in enumerate(states, _ROW_START_INDEX):
       reporting_field_name = state.get(STANDARD_FIELD_NAME)
       entity_code = state.get(ENTITY_CODE)
-      num_dependencies = 0
-      for field in fields:
-        if entity_code == field[ENTITY_CODE]:
-          if field[STANDARD_FIELD_NAME] == reporting_field_name:
-            num_dependencies += 1
-        if entity_code == field[REPORTING_ENTITY_CODE]:
-          if field[REPORTING_ENTITY_FIELD_NAME] == reporting_field_name:
-            num_dependencies += 1
+      state_key = (_CellKey(entity_code), _CellKey(reporting_field_name))
+      num_dependencies = (
+          fields_by_standard_name[state_key] +
+          fields_by_reporting_name[state_key])
 
       # Length must equal 1 because states should map many:1 with entity fields.
       if num_dependencies != 1:
-        cross_sheet_dependency_error = CrossSheetDependencyError(
+        yield CrossSheetDependencyError(
             source_table=STATES,
             target_table=ENTITY_FIELDS,
             row=row_num,
             column=STANDARD_FIELD_NAME,
             cell_value=reporting_field_name)
-        validation_errors.append(cross_sheet_dependency_error)
-    return validation_errors
 
   def _ValidateHeaders(
       self, table: str, parsed_sheet: List[Dict[str, str]],
-      column_headers: List[str]) -> List[SpreadsheetHeaderError]:
+      column_headers: List[str]) -> Iterator[SpreadsheetHeaderError]:
     """Validates that a spreadsheet contains column headers.
 
     Args:
@@ -247,28 +386,25 @@ class SpreadsheetValidator(object):
         column headers.
       column_headers: List of column headers.
 
-    Returns:
-      A list of SpreadsheetError instances.
+    Yields:
+      SpreadsheetError instances.
     """
-    validation_errors = []
-    parsed_headers = set()
     header_difference = set()
-    for row in parsed_sheet:
-      parsed_headers = parsed_headers.union(set(row.keys()))
-      header_difference = header_difference.union(
-          set(column_headers).difference(parsed_headers))
+    # Every row of a parsed sheet is keyed by the same column headers, so the
+    # first row is sufficient to determine which headers are present.
+    if parsed_sheet:
+      parsed_headers = set(parsed_sheet[0].keys())
+      header_difference = set(column_headers).difference(parsed_headers)
     if header_difference:
       for header in header_difference:
-        validation_errors.append(
-            SpreadsheetHeaderError(
-                table=table,
-                header=header,
-                message=f'{table} missing required column header: {header}'))
-    return validation_errors
+        yield SpreadsheetHeaderError(
+            table=table,
+            header=header,
+            message=f'{table} missing required column header: {header}')
 
   def _ValidateConnections(
-      self, parsed_spreadsheet: Dict[str, List[Dict[str, str]]]
-  ) -> List[ConnectionDependencyError]:
+      self, parsed_spreadsheet: Dict[str, List[Dict[str, str]]],
+      index: _SpreadsheetIndex) -> Iterator[ConnectionDependencyError]:
     """Validates connections in a concrete model spreadsheet.
 
     Some values in the connections table reference codes in both the entities
@@ -278,36 +414,34 @@ class SpreadsheetValidator(object):
     Args:
       parsed_spreadsheet: A concrete model spreadsheet parsed into python data
         types.
+      index: Lookup tables for parsed_spreadsheet.
 
-    Returns:
-      A list of SpreadsheetError instances.
+    Yields:
+      SpreadsheetError instances.
     """
-    validation_errors = []
     connections_sheet = parsed_spreadsheet[CONNECTIONS]
-    entities_sheet = parsed_spreadsheet[ENTITIES]
-    sites_sheet = parsed_spreadsheet[SITES]
+    if not connections_sheet:
+      return
     # codes - set of all entity codes present in both the Entities and
     # Sites sheets
-    codes = set(row[ENTITY_CODE] for row in entities_sheet).union(
-        set(row[BUILDING_CODE] for row in sites_sheet))
+    codes = index.all_codes
     for row_number, connection in enumerate(connections_sheet,
                                             _ROW_START_INDEX):
-      if connection[SOURCE_ENTITY_CODE] not in codes:
-        validation_errors.append(
-            ConnectionDependencyError(
-                row=row_number,
-                missing_code=connection[SOURCE_ENTITY_CODE],
-                present_code=connection[TARGET_ENTITY_CODE]))
-      if connection[TARGET_ENTITY_CODE] not in codes:
-        validation_errors.append(
-            ConnectionDependencyError(
-                row=row_number,
-                missing_code=connection[SOURCE_ENTITY_CODE],
-                present_code=connection[TARGET_ENTITY_CODE]))
-    return validation_errors
+      source_code = connection[SOURCE_ENTITY_CODE]
+      target_code = connection[TARGET_ENTITY_CODE]
+      if source_code not in codes:
+        yield ConnectionDependencyError(
+            row=row_number,
+            missing_code=source_code,
+            present_code=target_code)
+      if target_code not in codes:
+        yield ConnectionDependencyError(
+            row=row_number,
+            missing_code=target_code,
+            present_code=source_code)
 
   def ValidateFacilitiesGuids(
-      self, sheet: List[Dict[str, str]]) -> List[DuplicateCodeError]:
+      self, sheet: List[Dict[str, str]]) -> List[MissingSpreadsheetValueError]:
     """Validates that Guids are present for all Facilities entities.
 
     Args:
@@ -316,42 +450,75 @@ class SpreadsheetValidator(object):
     Returns:
       A list of Spreadsheet instances for missing Guids.
     """
-    # pylint: disable=line-too-long
     validation_errors = []
-    for row_number, row in enumerate(sheet):
-      if not row[BC_GUID] and row[NAMESPACE] == FACILITIES_NAMESPACE:
-        validation_errors.append(
-            MissingSpreadsheetValueError(
-                table=ENTITIES,
-                row=row_number,
-                column=BC_GUID,
-                message=f'{row[ENTITY_CODE]} in {FACILITIES_NAMESPACE} namespace must have a guid obtained through DB API export building config operation.'
-            ))
+    for row_number, row in enumerate(sheet, _ROW_START_INDEX):
+      guid_error = self._ValidateFacilitiesGuid(row_number, row)
+      if guid_error:
+        validation_errors.append(guid_error)
     return validation_errors
 
-  def _ValidateEntityCodes(
-      self, sheet: List[Dict[str, str]]) -> List[DuplicateCodeError]:
-    """Validates that a spreadsheet does not contain duplicate entity codes.
+  def _ValidateEntitiesSheet(
+      self, sheet: List[Dict[str, str]]
+  ) -> Tuple[List[DuplicateCodeError], List[MissingSpreadsheetValueError]]:
+    """Validates entity codes and Facilities guids in one pass over a sheet.
+
+    Checks that no entity code is defined more than once and that every entity
+    in the Facilities namespace has a guid, walking the sheet only once.
 
     Args:
-      sheet: A sheet to be validated for dulicate codes.
+      sheet: An Entities sheet to be validated.
 
     Returns:
-      A list of SpreadsheetError instances for duplicate entity codes.
+      A tuple of DuplicateCodeError instances for duplicate entity codes and
+      MissingSpreadsheetValueError instances for missing Facilities guids.
     """
-    validation_errors = []
-    list_of_codes = [row[ENTITY_CODE] for row in sheet]
-    duplicates = [
-        code for code, count in collections.Counter(list_of_codes).items()
-        if count > 1
-    ]
-    for duplicate in duplicates:
-      validation_errors.append(
+    # pylint: disable=line-too-long
+    guid_errors = []
+    # first_rows - row number where each code is first defined.
+    # duplicate_rows - every row number defining a duplicated code.
+    first_rows = {}
+    duplicate_rows = {}
+    for row_number, row in enumerate(sheet, _ROW_START_INDEX):
+      code = row.get(ENTITY_CODE)
+      if code in first_rows:
+        duplicate_rows.setdefault(code, [first_rows[code]]).append(row_number)
+      else:
+        first_rows[code] = row_number
+      guid_error = self._ValidateFacilitiesGuid(row_number, row)
+      if guid_error:
+        guid_errors.append(guid_error)
+    duplicate_errors = []
+    for duplicate, row_numbers in duplicate_rows.items():
+      rows = ', '.join(str(row_number) for row_number in row_numbers)
+      duplicate_errors.append(
           DuplicateCodeError(
               code=duplicate,
-              message=f'Entity Code: {duplicate} is defined more than once in {ENTITIES} table.'
+              message=f'Entity Code: {duplicate} is defined more than once in {ENTITIES} table, rows: {rows}.'
           ))
-    return validation_errors
+    return duplicate_errors, guid_errors
+
+  def _ValidateFacilitiesGuid(
+      self, row_number: int,
+      row: Dict[str, str]) -> Optional[MissingSpreadsheetValueError]:
+    """Validates that a single Facilities entity row has a guid.
+
+    Args:
+      row_number: Row number of the entity in the Entities table.
+      row: An entity row to be validated.
+
+    Returns:
+      A MissingSpreadsheetValueError instance if row is a Facilities entity
+      without a guid, otherwise None.
+    """
+    # pylint: disable=line-too-long
+    if row.get(BC_GUID) or row.get(NAMESPACE) != FACILITIES_NAMESPACE:
+      return None
+    return MissingSpreadsheetValueError(
+        table=ENTITIES,
+        row=row_number,
+        column=BC_GUID,
+        message=f'{row.get(ENTITY_CODE)} in {FACILITIES_NAMESPACE} namespace must have a guid obtained through DB API export building config operation.'
+    )
 
   def _LogErrors(self, validation_errors: List[BaseSpreadsheetError]) -> None:
     """Appends validation errors to the spreadsheet validation log.
@@ -359,11 +526,7 @@ class SpreadsheetValidator(object):
     Args:
       validation_errors: A list of errors extending BaseSpreadsheetError.
     """
-    logging.basicConfig(
-        filename=self.filepath,
-        filemode='w',
-        format='%(levelname)s - %(message)s',
-    )
-    logger = logging.getLogger()
+    if not self._logger.isEnabledFor(logging.ERROR):
+      return
     for error in validation_errors:
-      logger.error(error.GetErrorMessage())
+      self._logger.error('%s', error.GetErrorMessage())